@@ -1,8 +1,46 @@
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
+import functools
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 import argparse
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+
+SUPPORTED_FORMATS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+JPEG_FORMATS = ['JPEG', 'JPG', 'MPO']
+RESAMPLE_FILTERS = {
+    'lanczos': Image.Resampling.LANCZOS,
+    'bilinear': Image.Resampling.BILINEAR,
+    'box': Image.Resampling.BOX,
+}
+# Default fonts to try, in order, when no font is given. CJK-capable fonts come
+# first since the default watermark text is Chinese.
+SYSTEM_FONT_PATHS = [
+    # macOS
+    '/System/Library/Fonts/STHeiti Medium.ttc',
+    '/System/Library/Fonts/PingFang.ttc',
+    # Linux
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    # Windows
+    'C:\\Windows\\Fonts\\msyh.ttc',
+    'C:\\Windows\\Fonts\\simhei.ttf',
+]
+# Encoder settings per output format. JPEG quality is kept high since the
+# input has usually been JPEG-compressed once already; 4:2:0 chroma subsampling
+# and no extra Huffman optimization pass keep encoding on libjpeg's fast path.
+SAVE_KWARGS = {
+    'JPEG': {'quality': 90, 'subsampling': 2, 'optimize': False},
+    'MPO': {'quality': 90, 'subsampling': 2, 'optimize': False},
+}
+# Number of images each worker keeps in flight on both the read and write side.
+# With one reader and one writer thread, double buffering is enough to hide the
+# I/O, and every extra slot is another decoded image held in memory per worker.
+PREFETCH_DEPTH = 2
 
 class WatermarkOptions:
     def __init__(self, **kwargs):
@@ -13,6 +51,17 @@ class WatermarkOptions:
         self.padding = kwargs.get('padding', 20)
         self.shadow = ShadowOptions(**kwargs.get('shadow', {}))
         self.downsize_to = kwargs.get('downsize_to', None)
+        self.resample = kwargs.get('resample', 'bilinear')
+        self.png_compress_level = kwargs.get('png_compress_level', 1)
+        # Loaded font for font_path and font_size, resolved once by main()
+        self.font: Optional[ImageFont.FreeTypeFont] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Loaded fonts don't always survive pickling (Pillow's built-in font can't be
+        # reloaded), so pool workers resolve their own from font_path and font_size
+        state = self.__dict__.copy()
+        state['font'] = None
+        return state
 
 
 class ShadowOptions:
@@ -27,77 +76,252 @@ class ShadowOptions:
         return (self.offset_x, self.offset_y)
 
 
-def add_watermark(image_path: str, output_path: str, options: WatermarkOptions) -> None:
-    """Add watermark to an image with shadow effect."""
-    with Image.open(image_path) as img:
-        if img.mode != 'RGBA':
-            img = img.convert('RGBA')
+@functools.cache
+def get_system_font() -> Optional[str]:
+    """Return the first default font installed on this system, or None if there is none."""
+    for font_path in SYSTEM_FONT_PATHS:
+        if os.path.exists(font_path):
+            return font_path
+    return None
+
+
+@functools.lru_cache(maxsize=8)
+def _load_font(font_path: Optional[str], font_size: int) -> ImageFont.FreeTypeFont:
+    """Load a font once per (path, size).
+
+    Falls back to the system default font, then to Pillow's built-in font.
+    """
+    for path in (font_path, get_system_font()):
+        if path:
+            try:
+                return ImageFont.truetype(path, font_size)
+            except OSError:
+                pass
+    return ImageFont.load_default(font_size)
+
+
+def _composite(img: Image.Image, layer: Image.Image, dest: Tuple[int, int]) -> None:
+    """Alpha-composite layer onto img in place at dest, clipping to the image bounds."""
+    source = (max(0, -dest[0]), max(0, -dest[1]))
+    dest = (max(0, dest[0]), max(0, dest[1]))
+    if source[0] >= layer.width or source[1] >= layer.height:
+        return
+
+    if img.mode == 'RGB':
+        # RGB images are opaque, so compositing is a paste masked by the layer's alpha
+        if source != (0, 0):
+            layer = layer.crop((source[0], source[1], layer.width, layer.height))
+        img.paste(layer, dest, layer)
+    else:
+        img.alpha_composite(layer, dest, source)
+
+
+def _downsized_size(size: Tuple[int, int], max_size: Optional[int]) -> Tuple[int, int]:
+    """Return size scaled down to fit within max_size, or unchanged if it already fits."""
+    width, height = size
+    if not max_size or (width <= max_size and height <= max_size):
+        return size
+    ratio = min(max_size / width, max_size / height)
+    return (int(width * ratio), int(height * ratio))
+
+
+@functools.lru_cache(maxsize=16)
+def _build_tile(text: str, font: ImageFont.FreeTypeFont, opacity: float, padding: int,
+                shadow_offset_x: int, shadow_offset_y: int, shadow_blur: int,
+                shadow_opacity: float) -> Tuple[Image.Image, Tuple[int, int]]:
+    # Calculate position
+    bbox = font.getbbox(text)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+
+    # The tile only covers the text plus enough margin for the shadow offset and blur,
+    # so compositing never touches the rest of the image
+    pad = shadow_blur * 3 + max(abs(shadow_offset_x), abs(shadow_offset_y))
+    layer_size = (bbox[2] + 2 * pad, bbox[3] + 2 * pad)
+    watermark = Image.new('RGBA', layer_size, (0, 0, 0, 0))
+
+    # The shadow is flat black, so only its alpha channel needs to be drawn and blurred
+    shadow_mask = Image.new('L', layer_size, 0)
+
+    # Create drawing objects
+    draw_watermark = ImageDraw.Draw(watermark)
+    draw_shadow = ImageDraw.Draw(shadow_mask)
+
+    # Draw shadow
+    draw_shadow.text(
+        (pad + shadow_offset_x, pad + shadow_offset_y),
+        text,
+        font=font,
+        fill=int(255 * shadow_opacity)
+    )
+
+    # Apply shadow blur
+    shadow_mask = shadow_mask.filter(ImageFilter.GaussianBlur(shadow_blur))
+    shadow_layer = Image.new('RGBA', layer_size, (0, 0, 0, 0))
+    shadow_layer.putalpha(shadow_mask)
+
+    # Draw main watermark
+    draw_watermark.text(
+        (pad, pad),
+        text,
+        font=font,
+        fill=(255, 255, 255, int(255 * opacity))
+    )
+
+    # Bake shadow and text into one tile
+    tile = Image.alpha_composite(shadow_layer, watermark)
+    return tile, (text_width + padding + pad, text_height + padding + pad)
+
+
+def build_tile(options: WatermarkOptions) -> Tuple[Image.Image, Tuple[int, int]]:
+    """Build the watermark tile (text plus blurred shadow) for options.
+
+    Returns the tile and its offset from the bottom-right corner of the image.
+    Tiles are cached per set of options and shared between images, so callers
+    must not modify them.
+    """
+    shadow = options.shadow
+    font = options.font or _load_font(options.font_path, options.font_size)
+    return _build_tile(options.text, font, options.opacity,
+                       options.padding, shadow.offset_x, shadow.offset_y, shadow.blur,
+                       shadow.opacity)
+
+
+class Watermarker:
+    """Watermarks images with one fixed set of options.
+
+    Everything that only depends on the options (the watermark tile, the
+    resampling filter and the encoder settings per format) is resolved once
+    here, leaving just decode, blend and encode on the per-image path.
+    """
+
+    def __init__(self, options: WatermarkOptions):
+        self.downsize_to = options.downsize_to
+        self.resample = RESAMPLE_FILTERS[options.resample]
+        self.tile, self.tile_offset = build_tile(options)
+        self.save_kwargs = {fmt: dict(kwargs) for fmt, kwargs in SAVE_KWARGS.items()}
+        # zlib level 1 encodes several times faster than the default 6
+        # for only slightly larger files
+        self.save_kwargs['PNG'] = {'compress_level': options.png_compress_level}
+
+    def __call__(self, image_path: str, output_path: str) -> None:
+        """Add watermark to an image with shadow effect."""
+        img, original_format = self.load(image_path)
+        self.stamp(img)
+        self.save(img, output_path, original_format)
+
+    def load(self, image_path: str) -> Tuple[Image.Image, str]:
+        """Decode an image, downsized if needed, and return it with its original format.
+
+        Images that will be saved as JPEG are decoded to RGB, everything else to RGBA.
+        """
+        with Image.open(image_path) as img:
+            original_format = img.format or 'PNG'
+            new_size = _downsized_size(img.size, self.downsize_to)
+
+            # Let libjpeg scale JPEGs down by 1/2, 1/4 or 1/8 while decoding,
+            # instead of decoding at full resolution only to resize afterwards
+            if new_size != img.size and original_format in JPEG_FORMATS:
+                img.draft('RGB', new_size)
+            img.load()
+
+        # JPEG output has no alpha channel, so don't round-trip through RGBA
+        mode = 'RGB' if original_format.upper() in JPEG_FORMATS else 'RGBA'
+        if img.mode != mode:
+            img = img.convert(mode)
 
         # Downsize image if needed
-        if options.downsize_to:
-            max_size = options.downsize_to
-            if img.width > max_size or img.height > max_size:
-                ratio = min(max_size / img.width, max_size / img.height)
-                new_size = (int(img.width * ratio), int(img.height * ratio))
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-
-        # Create layers
-        watermark = Image.new('RGBA', img.size, (0, 0, 0, 0))
-        shadow_layer = Image.new('RGBA', img.size, (0, 0, 0, 0))
-
-        # Create drawing objects
-        draw_watermark = ImageDraw.Draw(watermark)
-        draw_shadow = ImageDraw.Draw(shadow_layer)
-
-        # Set up font
-        try:
-            font = (ImageFont.truetype(options.font_path, options.font_size)
-                   if options.font_path
-                   else ImageFont.truetype('/System/Library/Fonts/STHeiti Medium.ttc', options.font_size))
-        except:
-            font = ImageFont.truetype('/System/Library/Fonts/STHeiti Medium.ttc', options.font_size)
-
-        # Calculate position
-        bbox = draw_watermark.textbbox((0, 0), options.text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-
-        x = img.width - text_width - options.padding
-        y = img.height - text_height - options.padding
-
-        # Draw shadow
-        shadow_color = (0, 0, 0, int(255 * options.shadow.opacity))
-        draw_shadow.text(
-            (x + options.shadow.offset_x, y + options.shadow.offset_y),
-            options.text,
-            font=font,
-            fill=shadow_color
-        )
-
-        # Apply shadow blur
-        shadow_layer = shadow_layer.filter(ImageFilter.GaussianBlur(options.shadow.blur))
-
-        # Draw main watermark
-        draw_watermark.text(
-            (x, y),
-            options.text,
-            font=font,
-            fill=(255, 255, 255, int(255 * options.opacity))
-        )
-
-        # Combine layers
-        result = Image.alpha_composite(img, shadow_layer)
-        result = Image.alpha_composite(result, watermark)
-
-        # Save result in original format
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        original_format = Image.open(image_path).format or 'PNG'
+        # Large downscales are first reduced to within 2x of the target with a box
+        # filter, so the chosen filter only runs on the last step
+        if img.size != new_size:
+            img = img.resize(new_size, self.resample, reducing_gap=2.0)
+
+        return img, original_format
+
+    def stamp(self, img: Image.Image) -> Image.Image:
+        """Blend the watermark tile into the bottom-right corner of img in place."""
+        offset_x, offset_y = self.tile_offset
+        _composite(img, self.tile, (img.width - offset_x, img.height - offset_y))
+        return img
+
+    def save(self, img: Image.Image, output_path: str, original_format: str) -> None:
+        """Save the watermarked image in its original format.
+
+        The output directory must already exist.
+        """
         print(f"Format: {original_format}")
         # Convert to RGB if saving as JPEG
-        if original_format.upper() in ['JPEG', 'JPG', 'MPO']:
-            result = result.convert('RGB')
+        if original_format.upper() in JPEG_FORMATS and img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        img.save(output_path, original_format, **self.save_kwargs.get(original_format.upper(), {}))
+
+    def process_batch(self, tasks: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Watermark a batch of (input, output) paths.
+
+        Decoding and encoding run on a reader and a writer thread, up to
+        PREFETCH_DEPTH images ahead and behind, while this thread composites.
+        Pillow releases the GIL during file I/O and codec work, so the stages overlap.
+        """
+        pending = iter(tasks)
 
-        result.save(output_path, original_format)
+        with ThreadPoolExecutor(max_workers=1) as reader, ThreadPoolExecutor(max_workers=1) as writer:
+            reads = deque((output_path, reader.submit(self.load, image_path))
+                          for image_path, output_path in islice(pending, PREFETCH_DEPTH))
+            writes = deque()
+
+            while reads:
+                output_path, loaded = reads.popleft()
+                for image_path, next_output_path in islice(pending, 1):
+                    reads.append((next_output_path, reader.submit(self.load, image_path)))
+
+                img, original_format = loaded.result()
+                self.stamp(img)
+                writes.append(writer.submit(self.save, img, output_path, original_format))
+                # Only the writer needs the image now; drop our references so its
+                # buffer is freed as soon as it has been saved
+                del img, loaded
+
+                # Bound the number of finished images waiting on the writer
+                while len(writes) > PREFETCH_DEPTH:
+                    writes.popleft().result()
+
+            for written in writes:
+                written.result()
+
+        return tasks
+
+
+def add_watermark(image_path: str, output_path: str, options: WatermarkOptions) -> None:
+    """Add watermark to an image with shadow effect."""
+    Watermarker(options)(image_path, output_path)
+
+
+# Set in each pool worker by _init_worker, so options are sent and the
+# watermarker is built once per process rather than once per batch
+_worker_watermarker: Optional[Watermarker] = None
+
+
+def _init_worker(options: WatermarkOptions) -> None:
+    global _worker_watermarker
+    _worker_watermarker = Watermarker(options)
+
+
+def _watermark_batch(tasks: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Worker entry point: watermark a batch of (input, output) paths."""
+    return _worker_watermarker.process_batch(tasks)
+
+
+def _find_images(input_path: Path) -> List[Path]:
+    """Return all supported image files under input_path in a single directory walk."""
+    # os.walk is built on os.scandir, so file/directory checks come from the
+    # directory listing itself rather than a separate stat per entry
+    return sorted(
+        Path(root) / name
+        for root, _, files in os.walk(input_path)
+        for name in files
+        if os.path.splitext(name)[1].lower() in SUPPORTED_FORMATS
+    )
 
 
 def process_images(input_folder: str, output_folder: str, options: WatermarkOptions) -> None:
@@ -105,14 +329,37 @@ def process_images(input_folder: str, output_folder: str, options: WatermarkOpti
     input_path = Path(input_folder)
     output_folder_path = Path(output_folder)
 
-    for img_path in input_path.rglob('*'):
-        if img_path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
-            relative_path = img_path.relative_to(input_path)
-            output_path = output_folder_path / relative_path
-
-            print(f"Processing: {img_path}")
-            print(f"Saving to: {output_path}")
-            add_watermark(str(img_path), str(output_path), options)
+    # Largest files first (LPT scheduling), so one big image picked up at the
+    # end of the run doesn't keep a single core busy while the rest sit idle
+    image_paths = _find_images(input_path)
+    image_paths.sort(key=lambda img_path: img_path.stat().st_size, reverse=True)
+    output_paths = [output_folder_path / img_path.relative_to(input_path) for img_path in image_paths]
+    tasks = [(str(img_path), str(output_path))
+             for img_path, output_path in zip(image_paths, output_paths)]
+    print(f"Found {len(tasks)} images")
+
+    # Create every output directory up front instead of once per image
+    for output_dir in {output_path.parent for output_path in output_paths}:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Split into a few batches per core: enough to keep every core busy,
+    # large enough for each worker's read/write pipeline to fill up. Images are
+    # dealt out round-robin so every batch gets a similar mix of sizes, with the
+    # heaviest batches first.
+    workers = os.cpu_count() or 1
+    num_batches = min(len(tasks), workers * 4)
+    batches = [tasks[i::num_batches] for i in range(num_batches)]
+
+    # Each image is independent, so spread them across all cores. Every worker
+    # sets up its watermarker once and reuses it for all of its images.
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(options,)) as executor:
+        # One batch per dispatch, so idle workers pick up the next batch as they free up
+        for batch in executor.map(_watermark_batch, batches, chunksize=1):
+            for img_path, output_path in batch:
+                print(f"Processed: {img_path}")
+                print(f"Saved to: {output_path}")
 
 
 def parse_args() -> Dict[str, Any]:
@@ -129,6 +376,10 @@ def parse_args() -> Dict[str, Any]:
     parser.add_argument('--shadow-blur', type=int, default=3, help='Shadow blur radius')
     parser.add_argument('--shadow-opacity', type=float, default=0.7, help='Shadow opacity (0-1)')
     parser.add_argument('--downsize-to', type=int, help='Maximum size in pixels for any dimension')
+    parser.add_argument('--resample', choices=list(RESAMPLE_FILTERS), default='bilinear',
+                        help='Resampling filter used when downsizing')
+    parser.add_argument('--png-compress-level', type=int, choices=range(10), default=1,
+                        help='zlib compression level for PNG output (0-9)')
 
     return vars(parser.parse_args())
 
@@ -169,9 +420,14 @@ def main():
             'blur': args['shadow_blur'],
             'opacity': args['shadow_opacity']
         },
-        downsize_to=args['downsize_to']
+        downsize_to=args['downsize_to'],
+        resample=args['resample'],
+        png_compress_level=args['png_compress_level']
     )
 
+    # Resolve the font once up front rather than per image
+    options.font = _load_font(options.font_path, options.font_size)
+
     # Create output folder
     os.makedirs(args['output'], exist_ok=True)
 
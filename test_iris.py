@@ -2,13 +2,17 @@ import pytest
 from pathlib import Path
 import shutil
 import tempfile
-from PIL import Image
+from PIL import Image, ImageFont
 import os
+import pickle
 
 from iris import (
     WatermarkOptions,
     ShadowOptions,
+    Watermarker,
     add_watermark,
+    build_tile,
+    get_system_font,
     process_images
 )
 
@@ -50,6 +54,8 @@ class TestWatermarkOptions:
         assert options.font_size == 40
         assert options.opacity == 0.5
         assert options.padding == 20
+        assert options.resample == 'bilinear'
+        assert options.png_compress_level == 1
         assert isinstance(options.shadow, ShadowOptions)
 
     def test_custom_values(self):
@@ -67,6 +73,13 @@ class TestWatermarkOptions:
         assert options.shadow.offset_x == 5
         assert options.shadow.offset_y == 3  # Default value
 
+    def test_pickle_drops_loaded_font(self):
+        options = WatermarkOptions(text="Custom")
+        options.font = ImageFont.load_default(options.font_size)
+        restored = pickle.loads(pickle.dumps(options))
+        assert restored.font is None
+        assert restored.text == "Custom"
+
 class TestShadowOptions:
     def test_default_values(self):
         shadow = ShadowOptions()
@@ -84,6 +97,35 @@ class TestShadowOptions:
         assert shadow.opacity == 0.8
         assert shadow.offset == (5, 5)
 
+class TestBuildTile:
+    def test_tile_is_cached(self, default_options):
+        tile, offset = build_tile(default_options)
+        same_options = WatermarkOptions(
+            text=default_options.text,
+            font_size=default_options.font_size
+        )
+        assert build_tile(same_options)[0] is tile
+        assert tile.mode == 'RGBA'
+        assert offset[0] > default_options.padding
+        assert offset[1] > default_options.padding
+
+    def test_tile_depends_on_options(self, default_options):
+        tile, _ = build_tile(default_options)
+        other = WatermarkOptions(text="Other", font_size=default_options.font_size)
+        assert build_tile(other)[0] is not tile
+
+class TestFonts:
+    def test_system_font(self):
+        font_path = get_system_font()
+        assert font_path is None or os.path.exists(font_path)
+
+    def test_missing_font_falls_back(self, sample_image, temp_dir):
+        options = WatermarkOptions(text="Fallback", font_path="/nonexistent/font.ttf")
+        output_path = str(Path(temp_dir) / "fallback_output.png")
+
+        add_watermark(sample_image, output_path, options)
+        assert os.path.exists(output_path)
+
 class TestWatermarkFunctions:
     def test_add_watermark(self, sample_image, temp_dir, default_options):
         output_path = str(Path(temp_dir) / "output.png")
@@ -99,6 +141,20 @@ class TestWatermarkFunctions:
             assert img.mode == 'RGBA'
             assert img.size == (400, 300)
 
+    def test_watermarker_reuse(self, temp_dir, default_options):
+        # One watermarker handles any number of images of different formats
+        watermarker = Watermarker(default_options)
+        for name, mode in [("a.png", 'RGBA'), ("b.jpg", 'RGB'), ("c.png", 'RGBA')]:
+            input_path = Path(temp_dir) / f"in_{name}"
+            output_path = Path(temp_dir) / f"out_{name}"
+            Image.new(mode, (400, 300), 'white').save(input_path)
+
+            watermarker(str(input_path), str(output_path))
+
+            with Image.open(output_path) as result:
+                assert result.mode == mode
+                assert result.size == (400, 300)
+
     def test_process_images(self, temp_dir, default_options):
         # Create test directory structure
         input_dir = Path(temp_dir) / "input"
@@ -131,6 +187,28 @@ class TestWatermarkFunctions:
             with Image.open(output_dir / "test1.png") as out:
                 assert out.format == orig.format
 
+    def test_png_compress_level(self, sample_image, temp_dir):
+        sizes = {}
+        for level in (0, 9):
+            output_path = Path(temp_dir) / f"output_{level}.png"
+            options = WatermarkOptions(text="Test Watermark", png_compress_level=level)
+            add_watermark(sample_image, str(output_path), options)
+            sizes[level] = output_path.stat().st_size
+
+        assert sizes[9] < sizes[0]
+
+    def test_jpeg_format_preserved(self, temp_dir, default_options):
+        input_path = Path(temp_dir) / "test.jpg"
+        output_path = Path(temp_dir) / "output.jpg"
+        Image.new('RGB', (400, 300), (255, 255, 255)).save(input_path)
+
+        add_watermark(str(input_path), str(output_path), default_options)
+
+        with Image.open(output_path) as result:
+            assert result.format == 'JPEG'
+            assert result.mode == 'RGB'
+            assert result.size == (400, 300)
+
     def test_invalid_image(self, temp_dir, default_options):
         # Test with invalid image file
         invalid_image = Path(temp_dir) / "invalid.png"
@@ -143,6 +221,28 @@ class TestWatermarkFunctions:
         with pytest.raises(Exception):
             add_watermark(str(invalid_image), output_path, default_options)
 
+    def test_process_images_skips_directories(self, temp_dir, default_options):
+        # A directory whose name looks like an image must not be treated as one
+        input_dir = Path(temp_dir) / "input"
+        output_dir = Path(temp_dir) / "output"
+        os.makedirs(input_dir / "album.jpg")
+        Image.new('RGBA', (400, 300), (255, 255, 255, 255)).save(input_dir / "album.jpg" / "test.png")
+
+        process_images(str(input_dir), str(output_dir), default_options)
+
+        assert os.path.exists(output_dir / "album.jpg" / "test.png")
+
+    def test_process_images_invalid_image(self, temp_dir, default_options):
+        # Errors raised in worker processes should surface to the caller
+        input_dir = Path(temp_dir) / "input"
+        output_dir = Path(temp_dir) / "output"
+        os.makedirs(input_dir)
+        with open(input_dir / "invalid.png", 'w') as f:
+            f.write("Not an image")
+
+        with pytest.raises(Exception):
+            process_images(str(input_dir), str(output_dir), default_options)
+
     def test_unicode_text(self, sample_image, temp_dir):
         # Test with Unicode text
         options = WatermarkOptions(text="测试水印")
@@ -167,6 +267,18 @@ class TestWatermarkFunctions:
             with Image.open(output_path) as result:
                 assert result.size == size
 
+    def test_text_larger_than_image(self, temp_dir):
+        # Watermark layers that extend past the image edges should be clipped
+        input_path = Path(temp_dir) / "small.png"
+        output_path = Path(temp_dir) / "small_output.png"
+        Image.new('RGBA', (50, 20), (255, 255, 255, 255)).save(input_path)
+
+        options = WatermarkOptions(text="A very long watermark text", font_size=30)
+        add_watermark(str(input_path), str(output_path), options)
+
+        with Image.open(output_path) as result:
+            assert result.size == (50, 20)
+
     def test_downsize_large_image(self, temp_dir, default_options):
         # Test downsizing of large images
         original_size = (2000, 1500)
@@ -194,3 +306,27 @@ class TestWatermarkFunctions:
             original_ratio = original_size[0] / original_size[1]
             new_ratio = result.size[0] / result.size[1]
             assert abs(original_ratio - new_ratio) < 0.01
+
+    def test_downsize_large_jpeg(self, temp_dir):
+        # JPEGs are scaled down while decoding; the result must still hit the requested size
+        input_path = Path(temp_dir) / "large_test.jpg"
+        output_path = Path(temp_dir) / "downsized_output.jpg"
+        Image.new('RGB', (4000, 3000), (255, 255, 255)).save(input_path)
+
+        options = WatermarkOptions(text="Test Watermark", downsize_to=1000)
+        add_watermark(str(input_path), str(output_path), options)
+
+        with Image.open(output_path) as result:
+            assert result.size == (1000, 750)
+
+    @pytest.mark.parametrize('resample', ['lanczos', 'bilinear', 'box'])
+    def test_downsize_resample_filters(self, temp_dir, resample):
+        input_path = Path(temp_dir) / "large_test.png"
+        output_path = Path(temp_dir) / f"downsized_{resample}.png"
+        Image.new('RGBA', (2000, 1500), (255, 255, 255, 255)).save(input_path)
+
+        options = WatermarkOptions(text="Test Watermark", downsize_to=500, resample=resample)
+        add_watermark(str(input_path), str(output_path), options)
+
+        with Image.open(output_path) as result:
+            assert result.size == (500, 375)